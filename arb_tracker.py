@@ -2,199 +2,573 @@
 """
 ARB Token All-Time Low Price Tracker
 
-Monitors the ARB (Arbitrum) token price via Coinbase API and sends a Telegram
-notification whenever a new all-time low is reached.
+Monitors the ARB (Arbitrum) token price - or any other tokens listed in SYMBOLS -
+via the Coinbase WebSocket feed (with REST polling of Coinbase or Binance as a
+fallback) and sends a Telegram notification whenever a new all-time low is reached.
 
-Designed to run as a GitHub Action every 5 minutes, checking prices every second.
+Designed to run as a GitHub Action every 5 minutes, handling every streamed ticker update.
 """
 
-import json
+import asyncio
 import os
+import random
+import re
+import sqlite3
+import statistics
 import sys
 import time
-from datetime import datetime
+from collections import deque
+from datetime import datetime, timezone
 from pathlib import Path
 
-import requests
+import aiohttp
+import orjson
 
 # Configuration from environment variables
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 RUN_DURATION = int(os.getenv("RUN_DURATION", "295"))  # seconds (slightly under 5 min)
-CHECK_INTERVAL = float(os.getenv("CHECK_INTERVAL", "1"))  # seconds
+CHECK_INTERVAL = float(os.getenv("CHECK_INTERVAL", "1"))  # seconds (baseline, adapted to volatility)
+WS_CONNECT_TIMEOUT = float(os.getenv("WS_CONNECT_TIMEOUT", "5"))  # seconds
+NOTIFY_INTERVAL = float(os.getenv("NOTIFY_INTERVAL", "5"))  # min seconds between notifications
+SYMBOLS = [s.strip().upper() for s in os.getenv("SYMBOLS", "ARB").split(",") if s.strip()]
+PRICE_SOURCE = os.getenv("PRICE_SOURCE", "coinbase").lower()
+
+# REST price sources: endpoint per symbol, the pattern that pulls the price out of
+# the (tiny) response, and a cheap endpoint to warm the connection with.
+# Coinbase works from US IPs (e.g. GitHub Actions runners), unlike Binance.
+PRICE_SOURCES = {
+    "coinbase": {
+        "api_url": "https://api.coinbase.com/v2/prices/{symbol}-USD/spot",
+        "price_re": re.compile(rb'"amount"\s*:\s*"([^"]+)"'),
+        "warmup_url": "https://api.coinbase.com/v2/time",
+    },
+    "binance": {
+        "api_url": "https://api.binance.com/api/v3/ticker/price?symbol={symbol}USDT",
+        "price_re": re.compile(rb'"price"\s*:\s*"([^"]+)"'),
+        "warmup_url": "https://api.binance.com/api/v3/ping",
+    },
+}
+MAX_CONCURRENT_FETCHES = 8
+
+# The selected source is resolved once here, so fetching never branches on it
+_SOURCE = PRICE_SOURCES.get(PRICE_SOURCE, PRICE_SOURCES["coinbase"])
+PRICE_API_URL = _SOURCE["api_url"]
+_PRICE_RE = _SOURCE["price_re"]
+
+# Price responses are a few dozen bytes: skip compression and pull the price out directly
+PRICE_API_HEADERS = {"Accept-Encoding": "identity", "Accept": "application/json"}
+
+# Cheap endpoints probed at startup so DNS, TCP and TLS are done before the first real request
+WARMUP_URLS = (_SOURCE["warmup_url"], "https://api.telegram.org")
+
+# Coinbase Exchange WebSocket feed - pushes ticker updates over a single connection
+COINBASE_WS_URL = "wss://ws-feed.exchange.coinbase.com"
+
+# SQLite database (WAL mode) persisting one ATL row per symbol, cached between
+# GitHub Actions runs
+ATL_DATA_FILE = Path(__file__).parent / "atl_data.db"
+
+# JSON file used by earlier versions (ARB only) - only read, to carry the ATL over
+LEGACY_ATL_DATA_FILE = Path(__file__).parent / "atl_data.json"
+
+# Adaptive polling: the interval shrinks when the price moves and grows when it's flat
+MIN_CHECK_INTERVAL = 0.2  # seconds
+MAX_CHECK_INTERVAL = 5.0  # seconds
+VOLATILITY_TARGET = 1e-4  # relative stdev at which CHECK_INTERVAL is used as-is
+VOLATILITY_WINDOW = 10  # recent prices considered
+ATL_BOOST_INTERVAL = 0.25  # seconds between checks right after a new ATL...
+ATL_BOOST_DURATION = 30  # ...for this many seconds, to catch a cascade
+
+# Last fetched price and ETag per symbol - every check revalidates it, and a 304 reuses it
+_LAST: dict[str, dict] = {}
+
+# Bounds the REST fanout when many symbols are tracked
+_FETCH_LIMIT = asyncio.Semaphore(MAX_CONCURRENT_FETCHES)
+
+# Circuit breaker: after this many consecutive failed checks, back off exponentially
+# (with jitter) instead of retrying every tick; a Retry-After from the API also pauses polling
+FAILURE_THRESHOLD = 3
+MAX_BACKOFF = 60  # seconds
+_RETRY_AFTER = {"until": 0.0}  # monotonic time before which the API asked us not to call
+
+# Telegram Bot API endpoint (built once rather than on every message)
+_TELEGRAM_URL = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+
+# Telegram message templates (HTML), filled with %-formatting
+_INIT_TMPL = "<b>%s TRACKER INITIALIZED</b>\n\nStarting ATL: <b>$%.6f</b>"
+_ATL_TMPL = (
+    "<b>NEW %s ALL-TIME LOW!</b>\n\n"
+    "Price: <b>$%.6f</b>\n"
+    "Previous ATL: $%.6f\n"
+    "Drop: %.4f%%"
+)
+
+# In-flight notification tasks (referenced here so they aren't garbage collected)
+_BACKGROUND_TASKS: set[asyncio.Task] = set()
+
+
+async def get_price(session: aiohttp.ClientSession, symbol: str) -> float | None:
+    """Fetch the current USD price of a token from the price source (revalidated via ETag)."""
+    last = _LAST.setdefault(symbol, {"price": None, "etag": None})
+
+    headers = dict(PRICE_API_HEADERS)
+    if last["price"] is not None and last["etag"]:
+        headers["If-None-Match"] = last["etag"]
 
-# Coinbase API endpoint for ARB/USD (works from US IPs, unlike Binance)
-COINBASE_API_URL = "https://api.coinbase.com/v2/prices/ARB-USD/spot"
+    try:
+        async with _FETCH_LIMIT, session.get(
+            PRICE_API_URL.format(symbol=symbol),
+            headers=headers,
+            timeout=aiohttp.ClientTimeout(total=5),
+        ) as response:
+            if response.status == 304:
+                price = last["price"]
+            else:
+                if response.status in (429, 503) and "Retry-After" in response.headers:
+                    try:
+                        retry_after = float(response.headers["Retry-After"])
+                    except ValueError:  # HTTP-date form - fall back to the breaker's backoff
+                        pass
+                    else:
+                        _RETRY_AFTER["until"] = max(_RETRY_AFTER["until"], time.monotonic() + retry_after)
+                response.raise_for_status()
+                match = _PRICE_RE.search(await response.read())
+                if match is None:
+                    raise ValueError("price missing from response")
+                price = float(match.group(1))
+                last["etag"] = response.headers.get("ETag")
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+        print(f"Error fetching {symbol} price: {e}")
+        return None
 
-# File to persist ATL data (cached between GitHub Actions runs)
-ATL_DATA_FILE = Path(__file__).parent / "atl_data.json"
+    last["price"] = price
+    return price
 
 
-def get_arb_price() -> float | None:
-    """Fetch the current ARB token price from Coinbase."""
-    try:
-        response = requests.get(
-            COINBASE_API_URL,
-            timeout=5,
-        )
-        response.raise_for_status()
-        data = response.json()
-        return float(data["data"]["amount"])
-    except (requests.RequestException, KeyError, ValueError) as e:
-        print(f"Error fetching price: {e}")
-        return None
+def open_atl_db() -> sqlite3.Connection:
+    """Open (creating if needed) the ATL database."""
+    conn = sqlite3.connect(ATL_DATA_FILE)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("CREATE TABLE IF NOT EXISTS atl (symbol TEXT PRIMARY KEY, price REAL, ts INTEGER)")
+    return conn
 
 
-def load_atl_data() -> dict:
-    """Load ATL data from file."""
-    if ATL_DATA_FILE.exists():
+def load_legacy_atl_data() -> dict[str, dict]:
+    """Load the ARB ATL from the JSON file used by earlier versions, if present."""
+    if LEGACY_ATL_DATA_FILE.exists():
         try:
-            with open(ATL_DATA_FILE, "r") as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError):
+            legacy = orjson.loads(LEGACY_ATL_DATA_FILE.read_bytes())
+            timestamp = datetime.fromisoformat(legacy["atl_timestamp"].removesuffix("Z"))
+            return {"ARB": {
+                "atl_price": legacy["atl_price"],
+                "atl_timestamp": int(timestamp.replace(tzinfo=timezone.utc).timestamp() * 1e9),
+            }}
+        except (orjson.JSONDecodeError, IOError, KeyError, TypeError, AttributeError, ValueError):
             pass
-    return {"atl_price": None, "atl_timestamp": None}
+    return {}
 
 
-def save_atl_data(price: float) -> None:
-    """Save ATL data to file."""
-    data = {
-        "atl_price": price,
-        "atl_timestamp": datetime.utcnow().isoformat() + "Z",
+def load_atl_data(conn: sqlite3.Connection) -> dict[str, dict]:
+    """Load per-symbol ATL data (importing the legacy JSON file into an empty database)."""
+    atl_data = {
+        symbol: {"atl_price": price, "atl_timestamp": timestamp}
+        for symbol, price, timestamp in conn.execute("SELECT symbol, price, ts FROM atl")
     }
-    with open(ATL_DATA_FILE, "w") as f:
-        json.dump(data, f, indent=2)
-    print(f"ATL data saved: ${price:.6f}")
+    if not atl_data:
+        atl_data = load_legacy_atl_data()
+        for symbol, data in atl_data.items():
+            if data["atl_price"] is not None:
+                save_atl_data(conn, symbol, data)
+    return atl_data
+
+
+def save_atl_data(conn: sqlite3.Connection, symbol: str, data: dict) -> None:
+    """Save one symbol's ATL data (a single-row upsert)."""
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO atl VALUES (?, ?, ?)",
+            (symbol, data["atl_price"], data["atl_timestamp"]),
+        )
 
 
-def send_telegram_message(message: str) -> bool:
+async def send_telegram_message(session: aiohttp.ClientSession, message: str) -> bool:
     """Send a message via Telegram bot."""
     if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
         print("Telegram credentials not configured")
         return False
 
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
     try:
-        response = requests.post(
-            url,
+        async with session.post(
+            _TELEGRAM_URL,
             json={"chat_id": TELEGRAM_CHAT_ID, "text": message, "parse_mode": "HTML"},
-            timeout=10,
-        )
-        response.raise_for_status()
+            timeout=aiohttp.ClientTimeout(total=10),
+        ) as response:
+            response.raise_for_status()
         return True
-    except requests.RequestException as e:
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
         print(f"Error sending Telegram message: {e}")
         return False
 
 
-def check_price(atl_price: float | None) -> tuple[float | None, bool]:
+def is_new_atl(current_price: float, atl_price: float | None) -> bool:
+    """Return True if the price is below the recorded ATL (or no ATL exists yet)."""
+    return atl_price is None or current_price < atl_price
+
+
+async def check_prices(
+    session: aiohttp.ClientSession, atl_data: dict[str, dict]
+) -> list[tuple[str, float | None, bool]]:
     """
-    Check current price and determine if it's a new ATL.
-    Returns (current_price, is_new_atl).
+    Fetch every symbol's price concurrently and determine which are new ATLs.
+    Returns a list of (symbol, current_price, is_new_atl).
     """
-    current_price = get_arb_price()
-    if current_price is None:
-        return None, False
+    prices = await asyncio.gather(*(get_price(session, symbol) for symbol in SYMBOLS))
 
-    if atl_price is None or current_price < atl_price:
-        return current_price, True
-
-    return current_price, False
+    results = []
+    for symbol, current_price in zip(SYMBOLS, prices):
+        if current_price is None:
+            results.append((symbol, None, False))
+        else:
+            results.append((symbol, current_price, is_new_atl(current_price, atl_data[symbol]["atl_price"])))
+    return results
 
 
-def notify_new_atl(current_price: float, previous_atl: float | None) -> None:
-    """Send Telegram notification for new ATL."""
+async def notify_new_atl(
+    session: aiohttp.ClientSession, symbol: str, current_price: float, previous_atl: float | None
+) -> bool:
+    """Send Telegram notification for new ATL. Returns True if it was delivered."""
     if previous_atl is None:
-        message = (
-            f"<b>ARB TRACKER INITIALIZED</b>\n\n"
-            f"Starting ATL: <b>${current_price:.6f}</b>"
-        )
+        message = _INIT_TMPL % (symbol, current_price)
     else:
         drop_percent = ((previous_atl - current_price) / previous_atl) * 100
-        message = (
-            f"<b>NEW ARB ALL-TIME LOW!</b>\n\n"
-            f"Price: <b>${current_price:.6f}</b>\n"
-            f"Previous ATL: ${previous_atl:.6f}\n"
-            f"Drop: {drop_percent:.4f}%"
-        )
+        message = _ATL_TMPL % (symbol, current_price, previous_atl, drop_percent)
 
-    if send_telegram_message(message):
+    if await send_telegram_message(session, message):
         print("Telegram notification sent!")
-    else:
-        print("Failed to send Telegram notification")
+        return True
+    print("Failed to send Telegram notification")
+    return False
 
 
 def validate_config() -> bool:
     """Validate required configuration."""
     if not TELEGRAM_BOT_TOKEN:
         print("Error: TELEGRAM_BOT_TOKEN not set")
+        print("\nPlease set TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID environment variables.")
         return False
     if not TELEGRAM_CHAT_ID:
         print("Error: TELEGRAM_CHAT_ID not set")
+        print("\nPlease set TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID environment variables.")
+        return False
+    if PRICE_SOURCE not in PRICE_SOURCES:
+        print(f"Error: unknown PRICE_SOURCE {PRICE_SOURCE} (expected one of: {', '.join(PRICE_SOURCES)})")
+        return False
+    if not SYMBOLS:
+        print("Error: SYMBOLS is empty")
         return False
     return True
 
 
-def main() -> None:
-    """Main entry point - runs for RUN_DURATION seconds checking every second."""
-    print("ARB Token All-Time Low Tracker (Coinbase)")
-    print("=" * 50)
+async def warm_up_connections(session: aiohttp.ClientSession) -> None:
+    """Open the price source and Telegram connections in parallel so later calls reuse them."""
+    async def probe(url: str) -> None:
+        try:
+            async with session.get(
+                url,
+                allow_redirects=False,
+                timeout=aiohttp.ClientTimeout(total=3),
+            ) as response:
+                await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"Warm-up request to {url} failed: {e!r}")
 
-    if not validate_config():
-        print("\nPlease set TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID environment variables.")
-        sys.exit(1)
+    await asyncio.gather(*(probe(url) for url in WARMUP_URLS))
 
-    print(f"Run duration: {RUN_DURATION} seconds")
-    print(f"Check interval: {CHECK_INTERVAL} second(s)")
-    print("Starting price monitoring...\n")
 
-    # Load existing ATL
-    atl_data = load_atl_data()
-    atl_price = atl_data.get("atl_price")
+def _finish_background_task(task: asyncio.Task) -> None:
+    """Forget a finished background task, reporting it if it crashed."""
+    _BACKGROUND_TASKS.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Background notification task failed: {task.exception()!r}")
 
-    if atl_price:
-        print(f"Loaded existing ATL: ${atl_price:.6f}")
-    else:
-        print("No existing ATL found - will set on first price fetch")
 
-    start_time = time.time()
-    checks = 0
-    errors = 0
-    new_atls = 0
+async def flush_atl_notifications(session: aiohttp.ClientSession, state: dict, symbol: str) -> None:
+    """
+    Notify the symbol's pending ATL, at most once per NOTIFY_INTERVAL. ATLs arriving
+    while we wait replace the pending one, so a dip streak yields a single message.
+    """
+    notifier = state["notifiers"][symbol]
+    while notifier["pending_atl"] is not None:
+        delay = notifier["last_sent_at"] + NOTIFY_INTERVAL - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        current_price, notifier["pending_atl"] = notifier["pending_atl"], None
+        previous_atl, notifier["notified_atl"] = notifier["notified_atl"], current_price
+        notifier["last_sent_at"] = time.monotonic()
+        if not await notify_new_atl(session, symbol, current_price, previous_atl):
+            state["failed_notifications"] += 1
+
+
+def record_price(
+    session: aiohttp.ClientSession, state: dict, symbol: str, current_price: float, new_atl: bool
+) -> None:
+    """
+    Log a price update and, on a new ATL, persist it and queue a notification
+    in the background so the next price check isn't held up by Telegram.
+    """
+    atl_price = state["atl_data"][symbol]["atl_price"]
+    gm = time.gmtime()
+    timestamp = f"{gm.tm_hour:02d}:{gm.tm_min:02d}:{gm.tm_sec:02d}"
+    status = "NEW ATL!" if new_atl else ""
+    print(f"[{timestamp}] {symbol}: ${current_price:.6f} (ATL: ${atl_price or current_price:.6f}) {status}")
+
+    if new_atl:
+        state["new_atls"] += 1
+        state["last_atl_at"] = time.monotonic()
+        state["atl_data"][symbol] = {"atl_price": current_price, "atl_timestamp": time.time_ns()}
+        save_atl_data(state["db"], symbol, state["atl_data"][symbol])
+        print(f"ATL data saved: {symbol} ${current_price:.6f}")
+
+        notifier = state["notifiers"][symbol]
+        notifier["pending_atl"] = current_price
+        if notifier["task"] is None or notifier["task"].done():
+            task = asyncio.create_task(flush_atl_notifications(session, state, symbol))
+            _BACKGROUND_TASKS.add(task)
+            task.add_done_callback(_finish_background_task)
+            notifier["task"] = task
+
+
+async def feed_prices(ws: aiohttp.ClientWebSocketResponse, state: dict, tape: dict) -> None:
+    """
+    Write ticker prices from the WebSocket into the shared price tape until it closes.
+    The tape keeps, per symbol, the lowest price not yet seen by the decider, so no
+    dip is lost.
+    """
+    try:
+        async for msg in ws:
+            if msg.type == aiohttp.WSMsgType.ERROR:
+                print(f"WebSocket error: {ws.exception()}")
+                return
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                continue
+
+            try:
+                data = orjson.loads(msg.data)
+                if data.get("type") == "error":
+                    print(f"WebSocket feed error: {data.get('message')}")
+                    continue
+                if data.get("type") != "ticker":
+                    continue
+                symbol = data["product_id"].removesuffix("-USD")
+                current_price = float(data["price"])
+            except (orjson.JSONDecodeError, KeyError, ValueError) as e:
+                print(f"Error parsing ticker message: {e}")
+                state["errors"] += 1
+                continue
+
+            state["checks"] += 1
+            low = tape["lows"].get(symbol)
+            if low is None or current_price < low:
+                tape["lows"][symbol] = current_price
+            tape["updated"].set()
+    finally:
+        tape["closed"] = True
+        tape["updated"].set()
+
+
+async def decide_atl(session: aiohttp.ClientSession, state: dict, tape: dict) -> None:
+    """Compare prices from the tape against the ATL as they arrive, until the feed closes."""
+    while True:
+        await tape["updated"].wait()
+        tape["updated"].clear()
+
+        lows, tape["lows"] = tape["lows"], {}
+        for symbol, current_price in lows.items():
+            atl_price = state["atl_data"][symbol]["atl_price"]
+            record_price(session, state, symbol, current_price, is_new_atl(current_price, atl_price))
+
+        if tape["closed"]:
+            return
+
+
+async def stream_prices(session: aiohttp.ClientSession, state: dict, end_time: float) -> bool:
+    """
+    Stream ticker updates from the Coinbase WebSocket feed until end_time.
+    Returns False if the connection could not be established in time.
+    """
+    try:
+        ws = await asyncio.wait_for(
+            session.ws_connect(COINBASE_WS_URL, heartbeat=30),
+            timeout=WS_CONNECT_TIMEOUT,
+        )
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        print(f"WebSocket error: {e!r}")
+        return False
+
+    async with ws:
+        await ws.send_json({
+            "type": "subscribe",
+            "product_ids": [f"{symbol}-USD" for symbol in SYMBOLS],
+            "channels": ["ticker"],
+        })
+        tape = {"lows": {}, "closed": False, "updated": asyncio.Event()}
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(feed_prices(ws, state, tape), decide_atl(session, state, tape)),
+                timeout=max(0, end_time - time.time()),
+            )
+        except asyncio.TimeoutError:
+            pass
+    return True
 
-    while (time.time() - start_time) < RUN_DURATION:
-        loop_start = time.time()
-        checks += 1
 
-        current_price, is_new_atl = check_price(atl_price)
+def next_check_interval(recent_prices: deque, last_atl_at: float) -> float:
+    """Pick the polling interval from recent volatility (tightened right after a new ATL)."""
+    if time.monotonic() - last_atl_at < ATL_BOOST_DURATION:
+        return ATL_BOOST_INTERVAL
+    if len(recent_prices) < 2:
+        return CHECK_INTERVAL
 
-        if current_price is None:
-            errors += 1
+    volatility = statistics.stdev(recent_prices) / statistics.mean(recent_prices)
+    interval = CHECK_INTERVAL * (VOLATILITY_TARGET / max(volatility, 1e-6))
+    return min(MAX_CHECK_INTERVAL, max(MIN_CHECK_INTERVAL, interval))
+
+
+async def poll_prices(session: aiohttp.ClientSession, state: dict, end_time: float) -> None:
+    """
+    Poll the REST price source for all symbols until end_time, at an interval
+    adapted to the most volatile symbol.
+    """
+    recent_prices = {symbol: deque(maxlen=VOLATILITY_WINDOW) for symbol in SYMBOLS}
+    failures = 0
+    next_tick = time.monotonic()
+    while time.time() < end_time:
+        state["checks"] += len(SYMBOLS)
+
+        try:
+            results = await asyncio.wait_for(check_prices(session, state["atl_data"]), timeout=5)
+        except asyncio.TimeoutError:
+            print("Error fetching prices: timed out")
+            results = [(symbol, None, False) for symbol in SYMBOLS]
+
+        for symbol, current_price, new_atl in results:
+            if current_price is None:
+                state["errors"] += 1
+            else:
+                recent_prices[symbol].append(current_price)
+                record_price(session, state, symbol, current_price, new_atl)
+
+        if any(current_price is not None for _, current_price, _ in results):
+            failures = 0
+        else:
+            failures += 1
+
+        # Sleep until the next absolute tick so slow checks don't accumulate drift: after
+        # a slow check the next one fires immediately (get_price always hits the network,
+        # so it's a fresh sample); if we've fallen more than a full interval behind,
+        # resync instead of bursting
+        interval = min(
+            next_check_interval(prices, state["last_atl_at"]) for prices in recent_prices.values()
+        )
+        next_tick += interval
+        now = time.monotonic()
+        if next_tick < now - interval:
+            next_tick = now
+
+        # Stop hammering an API that keeps failing or has asked us to wait
+        if failures >= FAILURE_THRESHOLD:
+            backoff = min(MAX_BACKOFF, 2 ** failures) * random.uniform(0.5, 1.0)
+            print(f"{failures} consecutive failed checks - backing off for {backoff:.1f}s")
+            next_tick = max(next_tick, now + backoff)
+        next_tick = max(next_tick, _RETRY_AFTER["until"])
+
+        await asyncio.sleep(max(0, min(next_tick - now, end_time - time.time())))
+
+
+async def main() -> None:
+    """Main entry point - streams prices for RUN_DURATION seconds, polling if the stream is unavailable."""
+    print("Token All-Time Low Tracker")
+    print("=" * 50)
+
+    if not validate_config():
+        sys.exit(1)
+
+    print(f"Price source: {PRICE_SOURCE}")
+    print(f"Symbols: {', '.join(SYMBOLS)}")
+    print(f"Run duration: {RUN_DURATION} seconds")
+    print(f"Fallback check interval: {CHECK_INTERVAL} second(s)")
+    print("Starting price monitoring...\n")
+
+    # Load existing ATLs
+    db = open_atl_db()
+    atl_data = load_atl_data(db)
+    for symbol in SYMBOLS:
+        atl_price = atl_data.setdefault(symbol, {"atl_price": None, "atl_timestamp": None})["atl_price"]
+        if atl_price:
+            print(f"Loaded existing {symbol} ATL: ${atl_price:.6f}")
         else:
-            timestamp = datetime.utcnow().strftime("%H:%M:%S")
-            status = "NEW ATL!" if is_new_atl else ""
-            print(f"[{timestamp}] ARB: ${current_price:.6f} (ATL: ${atl_price or current_price:.6f}) {status}")
-
-            if is_new_atl:
-                new_atls += 1
-                notify_new_atl(current_price, atl_price)
-                atl_price = current_price
-                save_atl_data(atl_price)
-
-        # Sleep for remaining time in the interval
-        elapsed = time.time() - loop_start
-        sleep_time = max(0, CHECK_INTERVAL - elapsed)
-        if sleep_time > 0:
-            time.sleep(sleep_time)
+            print(f"No existing {symbol} ATL found - will set on first price fetch")
+
+    state = {
+        "db": db,
+        "atl_data": atl_data,
+        "checks": 0,
+        "errors": 0,
+        "new_atls": 0,
+        "failed_notifications": 0,
+        "last_atl_at": float("-inf"),
+        # Per-symbol notification batching (see flush_atl_notifications)
+        "notifiers": {
+            symbol: {
+                "pending_atl": None,
+                "notified_atl": atl_data[symbol]["atl_price"],
+                "last_sent_at": float("-inf"),
+                "task": None,
+            }
+            for symbol in SYMBOLS
+        },
+    }
+    end_time = time.time() + RUN_DURATION
+
+    # One keep-alive connection pool shared by the feed, REST fallback and Telegram;
+    # DNS answers are pinned for the whole (short) run
+    connector = aiohttp.TCPConnector(limit=10, keepalive_timeout=60, ttl_dns_cache=None)
+    async with aiohttp.ClientSession(
+        connector=connector,
+        json_serialize=lambda obj: orjson.dumps(obj).decode(),
+    ) as session:
+        await warm_up_connections(session)
+
+        # The WebSocket feed is Coinbase's; other sources are only polled
+        if PRICE_SOURCE == "coinbase":
+            if not await stream_prices(session, state, end_time):
+                print("WebSocket feed unavailable - falling back to REST polling")
+            elif time.time() < end_time:
+                print("WebSocket feed disconnected - falling back to REST polling")
+        await poll_prices(session, state, end_time)
+
+        # Let pending notifications finish before the session closes
+        # (failures are reported by _finish_background_task)
+        if _BACKGROUND_TASKS:
+            await asyncio.gather(*_BACKGROUND_TASKS, return_exceptions=True)
+
+    # Closing the last connection checkpoints the WAL back into atl_data.db
+    db.close()
 
     # Summary
     print("\n" + "=" * 50)
     print("Run complete!")
-    print(f"Total checks: {checks}")
-    print(f"Errors: {errors}")
-    print(f"New ATLs detected: {new_atls}")
-    print(f"Final ATL: ${atl_price:.6f}" if atl_price else "No ATL recorded")
+    print(f"Total checks: {state['checks']}")
+    print(f"Errors: {state['errors']}")
+    print(f"New ATLs detected: {state['new_atls']}")
+    print(f"Failed notifications: {state['failed_notifications']}")
+    for symbol in SYMBOLS:
+        atl_price = state["atl_data"][symbol]["atl_price"]
+        print(f"Final {symbol} ATL: ${atl_price:.6f}" if atl_price else f"No {symbol} ATL recorded")
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())